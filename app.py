@@ -1,10 +1,12 @@
 from urllib.parse import unquote
-from flask import Flask, request, jsonify, redirect
-from models import db, Quarto, Reserva, Cliente
+import json
+import time
+from flask import Flask, request, jsonify, redirect, Response, stream_with_context
+from models import db, Quarto, Reserva, Cliente, Mudanca, inicializa_contador, proxima_versao
+from database import configura_banco, sincroniza_replicas, somente_leitura, HEADER_VERSAO_ESCRITA
 from flask_cors import CORS
 from schemas import *
 from pydantic import ValidationError
-from datetime import datetime
 from flask_migrate import Migrate
 from flask_openapi3 import OpenAPI, Info, Tag
 
@@ -13,23 +15,60 @@ from flask_openapi3 import OpenAPI, Info, Tag
 
 info = Info(title="Minha API", version="1.0.0")
 app = OpenAPI(__name__, info=info)
-CORS(app)
+# O cabeçalho de versão precisa ser exposto para o front-end em outra origem
+CORS(app, expose_headers=[HEADER_VERSAO_ESCRITA])
 
 # Configuração do banco de dados
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.sqlite'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+configura_banco(app)
+
+# Configuração do stream de mudanças: duração máxima de cada conexão e
+# intervalo entre as consultas, em segundos
+app.config['MUDANCAS_STREAM_DURACAO'] = 300
+app.config['MUDANCAS_STREAM_INTERVALO'] = 1
 
 # Inicialização do SQLAlchemy
 db.init_app(app)
 # Criação das tabelas
 with app.app_context():
     db.create_all()
+    inicializa_contador()
+    sincroniza_replicas(db)
+
+
+# Comando para atualizar as réplicas SQLite locais: flask sincroniza-replicas
+@app.cli.command('sincroniza-replicas')
+def sincroniza_replicas_cli():
+    """Copia o banco primário SQLite para as réplicas SQLite locais"""
+    sincroniza_replicas(db)
 
 
 # Definições de rota
 quarto_tag = Tag(name='Quarto', description='Cadastro, consulta, edição e deleção de um quarto')
 reserva_tag = Tag(name='Reserva', description='Cadastro,consulta, edição e deleção de uma reserva.')
 cliente_tag = Tag(name='Cliente', description='Cadastro, consulta, edição e deleção de um cliente')
+mudanca_tag = Tag(name='Mudança', description='Consulta incremental das alterações feitas na base de dados')
+
+
+def registra_mudanca(entidade, operacao, objeto):
+    """Adiciona ao log de mudanças uma entrada referente ao objeto informado
+
+    Deve ser chamada antes do commit, para que a mudança seja gravada na mesma
+    transação da alteração. Em deleções, deve ser chamada antes do delete.
+    A versão vem de ContadorMudanca, que segue a ordem de commit.
+    """
+    db.session.flush()
+    dados = None
+    if operacao != 'delete':
+        db.session.refresh(objeto)
+        dados = json.dumps(objeto.serialize())
+    db.session.add(Mudanca(
+        versao=proxima_versao(),
+        entidade=entidade,
+        entidade_id=objeto.id,
+        operacao=operacao,
+        dados=dados,
+    ))
+
 # Rota principal
 @app.get('/')
 def home():
@@ -37,6 +76,7 @@ def home():
 
 # Rota para buscar todos os quartos
 @app.get('/quartos', tags=[quarto_tag], responses={"200": QuartoViewSchema})
+@somente_leitura
 def get_todos_quartos():
     """Lista todos os Quartos da base de dados
 
@@ -47,6 +87,7 @@ def get_todos_quartos():
 
 # Rota para buscar quartos vagos
 @app.get('/quartos_vagos', tags=[quarto_tag], responses={"200": QuartoViewSchema})
+@somente_leitura
 def get_quartos_vagos():
     """Lista todos os Quartos vagos da base de dados
 
@@ -72,6 +113,9 @@ def editar_quarto(query: QuartoBuscaPorIDSchema, form: QuartoEditSchema):
     }
 
     db.session.query(Quarto).filter(Quarto.id == quarto_id).update(quarto)
+    quarto_editado = db.session.get(Quarto, quarto_id)
+    if quarto_editado:
+        registra_mudanca('quarto', 'update', quarto_editado)
     db.session.commit()
 
     return jsonify({"message": "Informações do quarto atualizadas com sucesso"}), 200
@@ -92,6 +136,7 @@ def add_quarto(form: QuartoCreateSchema):
     )
     try:
         db.session.add(quarto)
+        registra_mudanca('quarto', 'create', quarto)
         db.session.commit()
         return jsonify({'message': 'Quarto criado com sucesso!'}), 201
 
@@ -116,6 +161,7 @@ def excluir_quarto(query: QuartoBuscaPorIDSchema):
         return jsonify({"error": "O quarto está ocupado. Favor fazer o checkout antes de excluir"}), 409
 
     # Se o quarto estiver vago, podemos prosseguir com a exclusão
+    registra_mudanca('quarto', 'delete', quarto)
     db.session.delete(quarto)
     db.session.commit()
 
@@ -138,6 +184,7 @@ def add_cliente(form: ClienteCreateSchema):
     )
     try:
         db.session.add(cliente)
+        registra_mudanca('cliente', 'create', cliente)
         db.session.commit()
         return jsonify({'message': 'Cliente criado com sucesso!'}), 201
 
@@ -147,6 +194,7 @@ def add_cliente(form: ClienteCreateSchema):
 
 # Rota para buscar todos os clientes
 @app.get('/clientes',tags=[cliente_tag], responses={"200": ClienteViewSchema})
+@somente_leitura
 def get_clientes():
     """Lista todos os Clientes da base de dados
 
@@ -173,6 +221,9 @@ def editar_cliente(query: ClienteBuscaPorIDSchema, form: ClienteEditSchema):
     }
    
     db.session.query(Cliente).filter(Cliente.id == cliente_id).update(cliente)
+    cliente_editado = db.session.get(Cliente, cliente_id)
+    if cliente_editado:
+        registra_mudanca('cliente', 'update', cliente_editado)
     db.session.commit()
 
     return jsonify({"message": "Informações do cliente atualizadas com sucesso"}), 200
@@ -195,6 +246,7 @@ def excluir_cliente(query: ClienteBuscaPorIDSchema):
         return jsonify({"error": "Cliente não pode ser deletado, pois está associado a uma reserva"}), 409
 
     # Se o cliente não estiver associado a nenhuma reserva, podemos prosseguir com a exclusão
+    registra_mudanca('cliente', 'delete', cliente)
     db.session.delete(cliente)
     db.session.commit()
 
@@ -227,16 +279,12 @@ def add_reserva(form: ReservaCreateSchema):
     if quarto.capacidade_maxima< form.numero_pessoas:
         return jsonify({'message' : 'O quarto não comporta a quantidade de pessoas fornecidas.'}), 400
     
-    # Convertendo as strings para objetos de data Python
-    data_checkin = datetime.strptime(form.data_checkin, '%Y-%m-%d').date()
-    data_checkout = datetime.strptime(form.data_checkout, '%Y-%m-%d').date()
-
-    # Criar a reserva
+    # Criar a reserva (as datas já chegam convertidas pelo schema)
     reserva = Reserva(     
         quarto_id=quarto_id,
         quarto=quarto,
-        data_checkin=data_checkin,
-        data_checkout=data_checkout,
+        data_checkin=form.data_checkin,
+        data_checkout=form.data_checkout,
         numero_pessoas=form.numero_pessoas,
         cliente_id=cliente_id,
         cliente=cliente
@@ -246,12 +294,15 @@ def add_reserva(form: ReservaCreateSchema):
     quarto.vago = False
 
     db.session.add(reserva)
+    registra_mudanca('reserva', 'create', reserva)
+    registra_mudanca('quarto', 'update', quarto)
     db.session.commit()
 
     return jsonify({'message': 'Reserva criada com sucesso!'}), 201
 
 # Rota para buscar todas as reservas existentes
 @app.get('/reservas', tags=[reserva_tag], responses={"200": ReservaViewSchema})
+@somente_leitura
 def get_reservas():
     """Lista todas as Reservas da base de dados
 
@@ -300,6 +351,7 @@ def editar_reserva(query: ReservaBuscaPorIDSchema, form: ReservaEditSchema):
     if form.quarto_id != reserva.quarto_id:
         quarto_antigo = Quarto.query.get(reserva.quarto_id)
         quarto_antigo.vago = True
+        registra_mudanca('quarto', 'update', quarto_antigo)
         db.session.commit()
 
     # Atualizar os dados da reserva
@@ -309,6 +361,7 @@ def editar_reserva(query: ReservaBuscaPorIDSchema, form: ReservaEditSchema):
     reserva.numero_pessoas = form.numero_pessoas
     reserva.cliente_id = form.cliente_id
 
+    registra_mudanca('reserva', 'update', reserva)
     db.session.commit()
 
     return jsonify({"message": "Informações da reserva atualizadas com sucesso"}), 200
@@ -340,13 +393,73 @@ def excluir_reserva(query:ReservaBuscaPorIDSchema):
 
     # Marcar o quarto como vago
     quarto.vago = True
+    registra_mudanca('quarto', 'update', quarto)
 
     # Remover a reserva
+    registra_mudanca('reserva', 'delete', reserva)
     db.session.delete(reserva)
     db.session.commit()
     
     return jsonify({"message": f"Reserva removida com sucesso"}), 200
 
+# Rota para buscar as mudanças a partir de uma versão
+@app.get('/mudancas', tags=[mudanca_tag], responses={"200": MudancaListaSchema, "400": ErrorSchema})
+@somente_leitura
+def get_mudancas(query: MudancaBuscaSchema):
+    """Lista as Mudanças com versão maior que a informada
+
+    Retorna as mudanças e a versão a ser usada na próxima consulta.
+    """
+    mudancas = (Mudanca.query
+                .filter(Mudanca.versao > query.since)
+                .order_by(Mudanca.versao)
+                .limit(query.limite)
+                .all())
+    versao = mudancas[-1].versao if mudancas else query.since
+    return jsonify({
+        'versao': versao,
+        'mudancas': [mudanca.serialize() for mudanca in mudancas]
+    })
+
+# Rota para acompanhar as mudanças via Server-Sent Events
+@app.get('/mudancas/stream', tags=[mudanca_tag])
+@somente_leitura
+def stream_mudancas(query: MudancaBuscaSchema):
+    """Envia as Mudanças a partir da versão informada via Server-Sent Events
+
+    Cada conexão é encerrada após MUDANCAS_STREAM_DURACAO segundos e o
+    navegador reconecta enviando o cabeçalho Last-Event-ID, que tem
+    prioridade sobre o parâmetro since.
+    """
+    ultimo_evento = request.headers.get('Last-Event-ID', '')
+    versao = int(ultimo_evento) if ultimo_evento.isdigit() else query.since
+    duracao = app.config['MUDANCAS_STREAM_DURACAO']
+    intervalo = app.config['MUDANCAS_STREAM_INTERVALO']
+
+    def eventos(versao):
+        # Tempo de espera, em milissegundos, antes de o navegador reconectar
+        yield f"retry: {intervalo * 1000}\n\n"
+        fim = time.monotonic() + duracao
+        while time.monotonic() < fim:
+            mudancas = (Mudanca.query
+                        .filter(Mudanca.versao > versao)
+                        .order_by(Mudanca.versao)
+                        .limit(query.limite)
+                        .all())
+            for mudanca in mudancas:
+                versao = mudanca.versao
+                yield f"id: {versao}\nevent: mudanca\ndata: {json.dumps(mudanca.serialize())}\n\n"
+            if not mudancas:
+                # Comentário usado para manter a conexão aberta
+                yield ": keep-alive\n\n"
+            # Encerra a transação para enxergar as próximas mudanças
+            db.session.rollback()
+            time.sleep(intervalo)
+
+    return Response(stream_with_context(eventos(versao)),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=5000)
@@ -0,0 +1,64 @@
+""" Micro-benchmark da validação dos schemas de entrada.
+
+Mede a vazão (validações por segundo) para payloads individuais e em lote.
+Executar com:
+
+    (env)$ python bench_schemas.py
+"""
+import timeit
+from datetime import date, timedelta
+from typing import List
+
+from pydantic import TypeAdapter
+
+from schemas import ClienteCreateSchema, ReservaCreateSchema, ReservaEditSchema
+
+
+REPETICOES = 5
+TAMANHO_LOTE = 1000
+
+hoje = date.today()
+payload_reserva = {
+    'quarto_id': 1,
+    'data_checkin': (hoje + timedelta(days=1)).isoformat(),
+    'data_checkout': (hoje + timedelta(days=3)).isoformat(),
+    'numero_pessoas': 2,
+    'cliente_id': 1,
+}
+payload_cliente = {
+    'nome': 'Juan',
+    'sobrenome': 'Azevedo',
+    'celular': '21996289958',
+    'email': 'juanmatheus@gmail.com',
+}
+
+
+def mede(nome, funcao, numero, itens_por_chamada=1):
+    """ Executa a função e imprime a melhor vazão obtida entre as repetições.
+    """
+    melhor = min(timeit.repeat(funcao, number=numero, repeat=REPETICOES))
+    vazao = numero * itens_por_chamada / melhor
+    print(f"{nome:<40} {vazao:>12,.0f} validações/s")
+
+
+def main():
+    mede('ClienteCreateSchema (individual)',
+         lambda: ClienteCreateSchema.model_validate(payload_cliente), 10000)
+    mede('ReservaCreateSchema (individual)',
+         lambda: ReservaCreateSchema.model_validate(payload_reserva), 10000)
+    mede('ReservaEditSchema (individual)',
+         lambda: ReservaEditSchema.model_validate(payload_reserva), 10000)
+
+    lote_reservas = TypeAdapter(List[ReservaCreateSchema])
+    lote = [payload_reserva] * TAMANHO_LOTE
+    mede(f'ReservaCreateSchema (lote de {TAMANHO_LOTE})',
+         lambda: lote_reservas.validate_python(lote), 20, TAMANHO_LOTE)
+
+    lote_clientes = TypeAdapter(List[ClienteCreateSchema])
+    lote = [payload_cliente] * TAMANHO_LOTE
+    mede(f'ClienteCreateSchema (lote de {TAMANHO_LOTE})',
+         lambda: lote_clientes.validate_python(lote), 20, TAMANHO_LOTE)
+
+
+if __name__ == "__main__":
+    main()
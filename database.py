@@ -0,0 +1,146 @@
+import os
+import random
+from functools import wraps
+from flask import g, request, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, select
+
+
+# Prefixo dos binds que representam réplicas somente leitura
+PREFIXO_REPLICA = 'replica_'
+# Cabeçalho de resposta com a versão gravada por uma escrita
+HEADER_VERSAO_ESCRITA = 'X-Versao-Mudanca'
+# Cabeçalho de requisição com a versão mínima que a leitura deve enxergar
+HEADER_VERSAO_MINIMA = 'X-Versao-Minima'
+
+
+def configura_banco(app):
+    """ Lê a configuração do banco de dados a partir das variáveis de ambiente.
+
+        DATABASE_URL: URI do banco primário (padrão: SQLite local).
+        DATABASE_REPLICA_URLS: URIs das réplicas, separadas por vírgula.
+    """
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///database.sqlite')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    replicas = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    app.config['SQLALCHEMY_BINDS'] = {f'{PREFIXO_REPLICA}{i}': url for i, url in enumerate(replicas)}
+
+    app.after_request(informa_versao)
+
+
+def engines_replicas(db):
+    """ Retorna os engines das réplicas configuradas para a aplicação atual.
+    """
+    return {key: engine for key, engine in db.engines.items()
+            if key and key.startswith(PREFIXO_REPLICA)}
+
+
+def sincroniza_replicas(db):
+    """ Copia o banco primário SQLite para as réplicas SQLite, que fazem o
+        papel de réplicas reais em testes locais. Réplicas de outros bancos
+        são mantidas pela replicação do próprio banco e são ignoradas.
+    """
+    primario = db.engines[None]
+    if primario.dialect.name != 'sqlite':
+        return
+    origem = primario.raw_connection()
+    try:
+        for engine in engines_replicas(db).values():
+            if engine.dialect.name != 'sqlite':
+                continue
+            destino = engine.raw_connection()
+            try:
+                origem.driver_connection.backup(destino.driver_connection)
+            finally:
+                destino.close()
+    finally:
+        origem.close()
+
+
+def somente_leitura(func):
+    """ Marca a rota como somente leitura, permitindo que suas consultas sejam
+        enviadas para uma réplica.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        g.somente_leitura = True
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def informa_versao(response):
+    """ Após uma escrita confirmada, informa no cabeçalho a versão gravada.
+        O cliente a reenvia em HEADER_VERSAO_MINIMA para ler as próprias
+        escritas mesmo com as réplicas atrasadas.
+    """
+    if g.get('versao_escrita'):
+        response.headers[HEADER_VERSAO_ESCRITA] = str(g.versao_escrita)
+    return response
+
+
+def _versao_minima():
+    valor = request.headers.get(HEADER_VERSAO_MINIMA, '')
+    return int(valor) if valor.isdigit() else 0
+
+
+def _versao_replica(engine):
+    # Importado aqui pois models depende deste módulo
+    from models import ContadorMudanca
+    with engine.connect() as conn:
+        versao = conn.execute(
+            select(ContadorMudanca.versao).where(ContadorMudanca.id == 1)
+        ).scalar()
+    return versao or 0
+
+
+def _escolhe_replica(replicas):
+    """ Escolhe uma réplica para a requisição, ou None se a réplica sorteada
+        ainda não alcançou a versão mínima pedida pelo cliente.
+    """
+    key = random.choice(list(replicas))
+    minima = _versao_minima()
+    if minima and _versao_replica(replicas[key]) < minima:
+        return None
+    return key
+
+
+def _pode_usar_replica():
+    return (has_request_context()
+            and g.get('somente_leitura')
+            and not g.get('houve_escrita'))
+
+
+class RoutingSession(Session):
+    """ Sessão que envia as leituras das rotas somente leitura para uma das
+        réplicas e todo o resto para o banco primário.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _pode_usar_replica():
+            replicas = engines_replicas(self._db)
+            if replicas:
+                # A mesma escolha vale para toda a requisição
+                if 'replica' not in g:
+                    g.replica = _escolhe_replica(replicas)
+                if g.replica:
+                    return replicas[g.replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _marca_escrita(session, flush_context):
+    if has_request_context():
+        g.houve_escrita = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _confirma_versao(session):
+    versao = session.info.pop('versao_pendente', None)
+    if versao and has_request_context():
+        g.versao_escrita = versao
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _descarta_versao(session):
+    session.info.pop('versao_pendente', None)
@@ -1,7 +1,9 @@
+import json
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from database import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class Quarto(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -69,3 +71,68 @@ class Cliente(db.Model):
             'celular': self.celular,
             'email': self.email
         }
+
+
+class Mudanca(db.Model):
+    """ Registro append-only das alterações feitas nas entidades. A versão é
+        usada como cursor pelos clientes que sincronizam de forma incremental.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, unique=True, index=True)
+    entidade = db.Column(db.String(20), nullable=False)
+    entidade_id = db.Column(db.Integer, nullable=False)
+    operacao = db.Column(db.String(10), nullable=False)
+    dados = db.Column(db.Text, nullable=True)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<Mudanca {self.versao}>'
+
+    def serialize(self):
+        return {
+            'versao': self.versao,
+            'entidade': self.entidade,
+            'entidade_id': self.entidade_id,
+            'operacao': self.operacao,
+            'dados': json.loads(self.dados) if self.dados else None,
+            'timestamp': self.timestamp.isoformat()
+        }
+
+
+class ContadorMudanca(db.Model):
+    """ Linha única com a última versão atribuída ao log de mudanças.
+
+        O id autoincremento não serve como cursor: em bancos com escrita
+        concorrente, uma transação pode obter o id 10, outra o id 11 e
+        confirmar primeiro, fazendo o cliente que já leu o 11 perder o 10.
+        O UPDATE neste contador bloqueia a linha até o commit, então as
+        versões são atribuídas na mesma ordem em que as transações são
+        confirmadas.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+
+
+def inicializa_contador():
+    """ Cria a linha do contador de versões caso ainda não exista.
+    """
+    if not db.session.get(ContadorMudanca, 1):
+        db.session.add(ContadorMudanca(id=1, versao=0))
+        db.session.commit()
+
+
+def proxima_versao():
+    """ Incrementa o contador de versões dentro da transação atual e retorna
+        o novo valor. A linha fica bloqueada até o commit ou rollback.
+    """
+    db.session.execute(
+        db.update(ContadorMudanca)
+        .where(ContadorMudanca.id == 1)
+        .values(versao=ContadorMudanca.versao + 1)
+    )
+    versao = db.session.execute(
+        db.select(ContadorMudanca.versao).where(ContadorMudanca.id == 1)
+    ).scalar_one()
+    # Informada ao cliente após o commit (ver database.informa_versao)
+    db.session.info['versao_pendente'] = versao
+    return versao
@@ -1,44 +1,48 @@
 import re
-from pydantic import BaseModel, validator, EmailStr
-from datetime import date, datetime
-from pydantic.error_wrappers import ValidationError
+from pydantic import BaseModel, Field, EmailStr, ValidationError, field_validator, model_validator
+from datetime import date
+from typing import Annotated, List, Optional
 from models import *
-from pydantic import BaseModel
+
+
+# Tipos restritos compartilhados pelos schemas. As restrições são verificadas
+# diretamente no pydantic-core, sem passar por validadores em Python.
+CapacidadeMaxima = Annotated[int, Field(ge=1, le=6)]
+ValorDiaria = Annotated[float, Field(gt=0, le=2000)]
+NumeroQuarto = Annotated[int, Field(ge=1, le=5000)]
+NumeroPessoas = Annotated[int, Field(ge=1, le=4)]
+Nome = Annotated[str, Field(pattern=r"^[A-Za-z]+$")]
+Celular = Annotated[str, Field(pattern=r"^[0-9]{11}$")]
+
+FORMATO_DATA = re.compile(r"^[0-9]{4}-[0-9]{2}-[0-9]{2}$")
+
+
+def converte_data(value):
+    """ Converte uma data no formato YYYY-MM-DD, rejeitando os demais
+        formatos aceitos pelo pydantic (datetime, timestamp, etc).
+    """
+    if isinstance(value, date):
+        return value
+    if not isinstance(value, str) or not FORMATO_DATA.match(value):
+        raise ValueError("O formato da data deve ser YYYY-MM-DD")
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError("O formato da data deve ser YYYY-MM-DD")
 
 
 #SCHEMAS REFERENTE AOS QUARTOS:
 
 
 class QuartoCreateSchema(BaseModel):
-    numero: int = 101
-    capacidade_maxima: int = 2
-    valor_diaria: float = 400
+    numero: NumeroQuarto = 101
+    capacidade_maxima: CapacidadeMaxima = 2
+    valor_diaria: ValorDiaria = 400
     vago: bool = True
 
-    @validator('capacidade_maxima')
-    def check_capacidade_maxima(cls, value):
-        if value < 1 or value > 6:
-            raise ValueError("A capacidade máxima do quarto deve estar entre 1 e 6")
-        return value
-
-    @validator('valor_diaria')
-    def check_valor_diaria(cls, value):
-        if value <= 0:
-            raise ValueError("O valor da diária deve ser maior que zero")
-        if value > 2000:
-            raise ValueError("O valor da diária não pode exceder 2000")
-        return value
-    
-    @validator('vago')
-    def check_vago(cls, value):
-        if not isinstance(value, bool):
-            raise ValueError("O campo 'vago' deve ser um booleano (True ou False)")
-        return value
-    
-    @validator('numero')
+    @field_validator('numero')
+    @classmethod
     def check_numero(cls, value):
-        if value < 1 or value > 5000:
-            raise ValueError("O número do quarto deve estar entre 1 e 5000")
         if Quarto.query.filter_by(numero=value).first():
             raise ValueError("O número do quarto já está em uso")
         return value
@@ -57,30 +61,10 @@ def apresenta_quarto(quarto: Quarto):
     
 class QuartoEditSchema(BaseModel):
     numero: int = 101
-    capacidade_maxima: int = 2
-    valor_diaria: float = 400
+    capacidade_maxima: CapacidadeMaxima = 2
+    valor_diaria: ValorDiaria = 400
     vago: bool = False
 
-    @validator('capacidade_maxima')
-    def check_capacidade_maxima(cls, value):
-        if value < 1 or value > 6:
-            raise ValueError("A capacidade máxima do quarto deve estar entre 1 e 6")
-        return value
-
-    @validator('valor_diaria')
-    def check_valor_diaria(cls, value):
-        if value <= 0:
-            raise ValueError("O valor da diária deve ser maior que zero")
-        if value > 2000:
-            raise ValueError("O valor da diária não pode exceder 2000")
-        return value
-    
-    @validator('vago')
-    def check_vago(cls, value):
-        if not isinstance(value, bool):
-            raise ValueError("O campo 'vago' deve ser um booleano (True ou False)")
-        return value
-    
 class QuartoViewSchema(BaseModel):
     id: int = 1
     numero: int = 101
@@ -106,22 +90,10 @@ class QuartoDelSchema(BaseModel):
 
 
 class ClienteCreateSchema(BaseModel):
-    nome: str = 'Juan'
-    sobrenome: str = 'Azevedo'
-    celular: str = '21996289958'
+    nome: Nome = 'Juan'
+    sobrenome: Nome = 'Azevedo'
+    celular: Celular = '21996289958'
     email: EmailStr = 'juanmatheus@gmail.com'
-
-    @validator('nome', 'sobrenome')
-    def check_nome_sobrenome(cls, value):
-        if not re.match("^[A-Za-z]+$", value):
-            raise ValueError("O campo 'nome' ou 'sobrenome' deve conter apenas letras")
-        return value
-
-    @validator('celular')
-    def check_celular(cls, value):
-        if not re.match("^[0-9]{11}$", value):
-            raise ValueError("O campo 'celular' deve conter exatamente 11 dígitos")
-        return value
     
 def apresenta_cliente(cliente: Cliente):
     """ Retorna uma representação de um cliente seguindo o schema definido em
@@ -137,23 +109,11 @@ def apresenta_cliente(cliente: Cliente):
        
 
 class ClienteEditSchema(BaseModel):
-    nome: str = 'Juan'
-    sobrenome: str = 'Azevedo'
-    celular: str = '21996289958'
+    nome: Nome = 'Juan'
+    sobrenome: Nome = 'Azevedo'
+    celular: Celular = '21996289958'
     email: EmailStr = 'juanmatheus@gmail.com'
 
-    @validator('nome', 'sobrenome')
-    def check_nome_sobrenome(cls, value):
-        if not re.match("^[A-Za-z]+$", value):
-            raise ValueError("O campo 'nome' ou 'sobrenome' deve conter apenas letras")
-        return value
-
-    @validator('celular')
-    def check_celular(cls, value):
-        if not re.match("^[0-9]{11}$", value):
-            raise ValueError("O campo 'celular' deve conter exatamente 11 dígitos")
-        return value
-
 class ClienteViewSchema(BaseModel):
     id: int = 1
     nome: str = 'Juan'
@@ -179,45 +139,28 @@ class ClienteBuscaPorIDSchema(BaseModel):
 
 class ReservaCreateSchema(BaseModel):
     quarto_id: int = 1
-    data_checkin: str = "2025-01-01"
-    data_checkout: str = "2025-01-02"
-    numero_pessoas: int = 2
+    data_checkin: date = date(2025, 1, 1)
+    data_checkout: date = date(2025, 1, 2)
+    numero_pessoas: NumeroPessoas = 2
     cliente_id: int = 1
 
-    @validator('data_checkin', 'data_checkout')
+    @field_validator('data_checkin', 'data_checkout', mode='before')
+    @classmethod
     def check_date_format(cls, value):
-        try:
-            datetime.strptime(value, '%Y-%m-%d')
-        except ValueError:
-            raise ValueError("O formato da data deve ser YYYY-MM-DD")
-        return value
+        return converte_data(value)
 
-    @validator('data_checkin')
-    def check_data_checkin(cls, value, values):
-        try:
-            data_checkin = datetime.strptime(value, '%Y-%m-%d').date()
-            if data_checkin < date.today():
-                raise ValueError("A data de check-in não pode ser no passado")
-        except ValueError:
-            raise ValueError("A data de check-in não é válida")
-        return value
-
-    @validator('data_checkout')
-    def check_data_checkout(cls, value, values):
-        try:
-            data_checkout = datetime.strptime(value, '%Y-%m-%d').date()
-            data_checkin = datetime.strptime(values.get('data_checkin'), '%Y-%m-%d').date()
-            if data_checkout <= data_checkin:
-                raise ValueError("A data de check-out deve ser posterior à data de check-in")
-        except ValueError:
-            raise ValueError("A data de check-out não é válida")
+    @field_validator('data_checkin')
+    @classmethod
+    def check_data_checkin(cls, value):
+        if value < date.today():
+            raise ValueError("A data de check-in não pode ser no passado")
         return value
 
-    @validator('numero_pessoas')
-    def check_numero_pessoas(cls, value):
-        if value <= 0 or value > 4:
-            raise ValueError("A capacidade máxima do quarto deve estar entre 1 e 4")
-        return value
+    @model_validator(mode='after')
+    def check_data_checkout(self):
+        if self.data_checkout <= self.data_checkin:
+            raise ValueError("A data de check-out deve ser posterior à data de check-in")
+        return self
 
 
 def apresenta_reserva(reserva: Reserva):
@@ -236,30 +179,29 @@ def apresenta_reserva(reserva: Reserva):
 
 class ReservaEditSchema(BaseModel):
     quarto_id: int = 1
-    data_checkin: str = "2025-01-01"
-    data_checkout: str = "2025-01-02"
-    numero_pessoas: int = 2
+    data_checkin: date = date(2025, 1, 1)
+    data_checkout: date = date(2025, 1, 2)
+    numero_pessoas: NumeroPessoas = 2
     cliente_id: int = 1
 
-    @validator('data_checkin')
+    @field_validator('data_checkin', 'data_checkout', mode='before')
+    @classmethod
+    def check_date_format(cls, value):
+        return converte_data(value)
+
+    @field_validator('data_checkin')
+    @classmethod
     def check_data_checkin(cls, value):
-        data_checkin = datetime.strptime(value, '%Y-%m-%d').date()
-        if data_checkin < date.today():
+        if value < date.today():
             raise ValueError("A data de check-in não pode ser no passado")
-        return data_checkin
-    @validator('data_checkout')
-    def check_data_checkout(cls, value, values):
-        data_checkout = datetime.strptime(value, '%Y-%m-%d').date()
-        data_checkin = values.get('data_checkin')
-        if data_checkout <= data_checkin:
-            raise ValueError("A data de check-out deve ser posterior à data de check-in")
-        return data_checkout
-    @validator('numero_pessoas')
-    def check_numero_pessoas(cls, value):
-        if value <= 0 or value > 4:
-            raise ValueError("A capacidade máxima do quarto deve estar entre 1 e 4")
         return value
 
+    @model_validator(mode='after')
+    def check_data_checkout(self):
+        if self.data_checkout <= self.data_checkin:
+            raise ValueError("A data de check-out deve ser posterior à data de check-in")
+        return self
+
 
 class ReservaViewSchema(BaseModel):
     id: int = 1
@@ -285,6 +227,30 @@ class ReservaDelSchema(BaseModel):
     mesage: str
     id: int
 
+#SCHEMAS REFERENTE AO LOG DE MUDANÇAS:
+
+class MudancaBuscaSchema(BaseModel):
+    """ Define como deve ser a estrutura que representa a busca incremental.
+        Retorna apenas as mudanças com versão maior que 'since'.
+    """
+    since: Annotated[int, Field(ge=0)] = 0
+    limite: Annotated[int, Field(ge=1, le=1000)] = 500
+
+class MudancaViewSchema(BaseModel):
+    versao: int = 1
+    entidade: str = 'quarto'
+    entidade_id: int = 1
+    operacao: str = 'create'
+    dados: Optional[dict] = None
+    timestamp: str = "2025-01-01T00:00:00"
+
+class MudancaListaSchema(BaseModel):
+    """ Define como uma lista de mudanças será retornada, junto da última
+        versão que o cliente deve usar na próxima consulta.
+    """
+    versao: int = 1
+    mudancas: List[MudancaViewSchema]
+
 class ErrorSchema(BaseModel):
     """ Define como uma mensagem de erro será representada
     """
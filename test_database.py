@@ -0,0 +1,82 @@
+import pytest
+from flask import Flask, Response, g
+from database import configura_banco, sincroniza_replicas, informa_versao, HEADER_VERSAO_ESCRITA, HEADER_VERSAO_MINIMA
+from models import db, Quarto, Mudanca, inicializa_contador, proxima_versao
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """ Aplicação com um primário e uma réplica, ambos em arquivos SQLite.
+    """
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'primario.sqlite'}")
+    monkeypatch.setenv('DATABASE_REPLICA_URLS', f"sqlite:///{tmp_path / 'replica.sqlite'}")
+    app = Flask(__name__)
+    configura_banco(app)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        inicializa_contador()
+        sincroniza_replicas(db)
+    return app
+
+
+def grava_quarto(numero):
+    """ Grava um quarto e sua mudança, como fazem as rotas de escrita.
+    """
+    quarto = Quarto(numero=numero, capacidade_maxima=2, valor_diaria=100)
+    db.session.add(quarto)
+    db.session.flush()
+    db.session.add(Mudanca(versao=proxima_versao(), entidade='quarto',
+                           entidade_id=quarto.id, operacao='create'))
+    db.session.commit()
+
+
+def test_rota_somente_leitura_usa_replica(app):
+    with app.test_request_context():
+        g.somente_leitura = True
+        assert db.session.get_bind(Quarto) is db.engines['replica_0']
+
+
+def test_rota_sem_marcacao_usa_primario(app):
+    with app.test_request_context():
+        assert db.session.get_bind(Quarto) is db.engines[None]
+
+
+def test_escrita_fixa_primario_na_mesma_requisicao(app):
+    with app.test_request_context():
+        g.somente_leitura = True
+        grava_quarto(101)
+        assert db.session.get_bind(Quarto) is db.engines[None]
+        assert Quarto.query.count() == 1
+
+
+def test_escrita_informa_versao_no_cabecalho(app):
+    with app.test_request_context(method='POST'):
+        grava_quarto(101)
+        response = informa_versao(Response())
+        assert response.headers[HEADER_VERSAO_ESCRITA] == '1'
+
+
+def test_versao_minima_usa_primario_ate_replica_alcancar(app):
+    with app.test_request_context(method='POST'):
+        grava_quarto(101)
+
+    # A réplica ainda está na versão 0
+    with app.test_request_context(headers={HEADER_VERSAO_MINIMA: '1'}):
+        g.somente_leitura = True
+        assert db.session.get_bind(Quarto) is db.engines[None]
+        assert Quarto.query.count() == 1
+
+    # Sem a versão mínima a leitura vai para a réplica atrasada
+    with app.test_request_context():
+        g.somente_leitura = True
+        assert db.session.get_bind(Quarto) is db.engines['replica_0']
+        assert Quarto.query.count() == 0
+
+    with app.app_context():
+        sincroniza_replicas(db)
+
+    with app.test_request_context(headers={HEADER_VERSAO_MINIMA: '1'}):
+        g.somente_leitura = True
+        assert db.session.get_bind(Quarto) is db.engines['replica_0']
+        assert Quarto.query.count() == 1